@@ -0,0 +1,129 @@
+"""
+Persistent in-process cache mapping a domain to its organization type (urheber)
+"""
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.getenv("URHEBER_CACHE_PATH", "urheber_cache.json")
+DEFAULT_MAXSIZE = 50_000
+DEFAULT_TTL = 86400
+
+
+class DomainCache:
+    """LRU cache with TTL for domain -> urheber classifications, persisted as JSON"""
+
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE_PATH,
+                 maxsize: int = DEFAULT_MAXSIZE, ttl: int = DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        # Values are (urheber, stored_at) so the age survives a persist/resume cycle
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.RLock()
+        self.resume()
+
+    @staticmethod
+    def normalize(domain: str) -> str:
+        """Normalize a domain into a cache key"""
+        return domain.strip().lower()
+
+    def get(self, domain: str) -> Optional[str]:
+        """Return the cached urheber for a domain or None"""
+        key = self.normalize(domain)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            urheber, stored_at = entry
+            if time.time() - stored_at > self.ttl:
+                del self._cache[key]
+                return None
+            return urheber
+
+    def set(self, domain: str, urheber: str) -> None:
+        """Store the urheber for a domain"""
+        if not urheber:
+            return
+        with self._lock:
+            self._cache[self.normalize(domain)] = (urheber, time.time())
+
+    def persist(self) -> None:
+        """Write the cache contents to disk"""
+        if not self.path:
+            return
+        with self._lock:
+            data = {key: list(entry) for key, entry in self._cache.items()}
+        tmp_path = None
+        try:
+            # Unique temp file per writer, so processes exiting together don't clobber each other
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=os.path.dirname(os.path.abspath(self.path)),
+                prefix=os.path.basename(self.path) + ".", suffix=".tmp", delete=False
+            ) as f:
+                tmp_path = f.name
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("Error persisting domain cache to %s: %s", self.path, e)
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def resume(self) -> None:
+        """Load previously persisted entries, skipping expired ones"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Error loading domain cache from %s: %s", self.path, e)
+            return
+        if not isinstance(data, dict):
+            logger.warning("Ignoring domain cache %s: expected a JSON object", self.path)
+            return
+        now = time.time()
+        skipped = 0
+        with self._lock:
+            for key, entry in data.items():
+                if not self._is_valid_entry(entry):
+                    skipped += 1
+                    continue
+                urheber, stored_at = entry
+                if now - stored_at <= self.ttl:
+                    self._cache[key] = (urheber, stored_at)
+        if skipped:
+            logger.warning("Skipped %d malformed entries in domain cache %s", skipped, self.path)
+
+    @staticmethod
+    def _is_valid_entry(entry) -> bool:
+        """Check that a persisted entry is an [urheber, stored_at] pair"""
+        if not isinstance(entry, list) or len(entry) != 2:
+            return False
+        urheber, stored_at = entry
+        return (
+            isinstance(urheber, str) and urheber != ""
+            and isinstance(stored_at, (int, float)) and not isinstance(stored_at, bool)
+        )
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_domain_cache() -> DomainCache:
+    """Return the process-wide domain cache, persisted on interpreter shutdown"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = DomainCache()
+            atexit.register(_default_cache.persist)
+        return _default_cache
@@ -0,0 +1,96 @@
+"""
+Pattern-based classification of domains that does not need an LLM call
+"""
+import json
+import logging
+import os
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+KNOWN_ORGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "known_orgs.json")
+
+# Top-level domains reserved for state institutions
+STATE_TLDS = {"gov", "mil"}
+
+# Second-level suffixes reserved for state institutions
+STATE_SUFFIXES = frozenset({
+    "bund.de",
+    "gv.at",
+    "admin.ch",
+    "gouv.fr",
+    "gov.uk",
+    "gc.ca",
+    "gov.au",
+    "govt.nz",
+    "gov.in",
+    "gob.es",
+    "gov.it",
+    "gov.pl",
+})
+
+
+def load_known_orgs(path: str = KNOWN_ORGS_PATH) -> Dict[str, str]:
+    """
+    Load the curated mapping of registrable domain -> urheber category.
+    
+    Args:
+        path: Path to the JSON file
+    
+    Returns:
+        Mapping of lowercase domain to category (empty if the file cannot be read)
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            return {domain.lower(): category for domain, category in json.load(f).items()}
+    except (OSError, ValueError) as e:
+        logger.warning("Error loading known organizations from %s: %s", path, e)
+        return {}
+
+
+def build_suffix_table(known_orgs: Dict[str, str]) -> Dict[str, str]:
+    """
+    Merge state TLDs/suffixes and known organizations into one suffix -> category table.
+    
+    Args:
+        known_orgs: Mapping returned by load_known_orgs
+    
+    Returns:
+        Mapping of label-aligned domain suffix to category
+    """
+    table = {suffix: "staatlich" for suffix in STATE_TLDS | STATE_SUFFIXES}
+    table.update(known_orgs)
+    return table
+
+
+def match_domain_pattern(full_domain: str, suffix_table: Dict[str, str]) -> Optional[str]:
+    """
+    Classify a domain by the longest matching suffix in the suffix table.
+    
+    The domain's label-aligned suffixes are probed longest first, so a lookup costs
+    one dict probe per label regardless of the table size, and subdomains of known
+    organizations (e.g., hamburg.drk.de) match as well.
+    
+    Args:
+        full_domain: Lowercase domain including TLD (e.g., bmi.bund.de)
+        suffix_table: Mapping returned by build_suffix_table
+    
+    Returns:
+        The urheber category, or None if no pattern matches
+    """
+    for suffix in _label_suffixes(full_domain):
+        category = suffix_table.get(suffix)
+        if category:
+            return category
+    
+    return None
+
+
+def _label_suffixes(full_domain: str):
+    """Yield every label-aligned suffix of a domain, longest first (a.b.c -> a.b.c, b.c, c)"""
+    start = 0
+    while start != -1:
+        yield full_domain[start:]
+        start = full_domain.find(".", start)
+        if start != -1:
+            start += 1
@@ -0,0 +1,38 @@
+"""
+Non-blocking logging configuration for the analyzers
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+from typing import Optional
+
+_listener = None
+
+
+def setup_logging(level: int = logging.INFO, handler: Optional[logging.Handler] = None) -> None:
+    """
+    Route all log records through a queue so workers never block on log I/O.
+    
+    The root logger gets a QueueHandler; a QueueListener thread writes the records
+    to ``handler`` (stderr by default). Calling this again only changes the level.
+    
+    Args:
+        level: Root log level, e.g. logging.DEBUG for per-domain diagnostics
+        handler: Handler doing the actual output
+    """
+    global _listener
+    root = logging.getLogger()
+    root.setLevel(level)
+    if _listener is not None:
+        return
+    
+    if handler is None:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    
+    log_queue = queue.SimpleQueue()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -0,0 +1,186 @@
+"""
+Indexed domain lookup for urheber classifications: key normalization, index and migration
+
+The analyzers look up known domains by the precomputed ``domain_key`` and
+``has_urheber`` fields, using a covering index. Neither the fields nor the index
+are created on the read path; set them up once per collection with::
+
+    python lookup_index.py --uri mongodb://host:27017 --db <database> --collection <collection>
+
+(``--uri``, ``--db`` and ``--collection`` default to $MONGO_URI, $MONGO_DB and
+$MONGO_COLLECTION.) This creates the index and backfills both fields on existing
+documents. It is safe to re-run. Until it has run, documents classified before the
+indexed lookup are not found by it and their domains are researched again.
+
+Any other code writing ``urheber`` to the collection must also set ``domain_key``
+(see make_domain_key) and ``has_urheber``, or its documents stay invisible to the lookup.
+"""
+import argparse
+import logging
+import os
+from functools import lru_cache
+from typing import List, Optional
+
+import idna
+from pymongo import MongoClient, UpdateOne
+
+from logging_setup import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# Name and keys of the covering index used by the domain lookup
+URHEBER_INDEX_NAME = "domain_key_has_urheber_cover"
+URHEBER_INDEX_KEYS = [("domain_key", 1), ("has_urheber", 1), ("urheber", 1)]
+
+# Number of documents updated per bulk write in migrate_lookup_fields
+MIGRATION_BATCH_SIZE = 1000
+
+
+@lru_cache(maxsize=65536)
+def make_domain_key(domain: str) -> str:
+    """
+    Build the canonical lookup key for a domain: IDNA (punycode) encoded ASCII, lowercase.
+    
+    Args:
+        domain: Full domain including TLD (e.g., müller.de)
+    
+    Returns:
+        Normalized domain key (e.g., xn--mller-kva.de)
+    """
+    domain = domain.strip().lower()
+    try:
+        return idna.encode(domain, uts46=True).decode("ascii").lower()
+    except idna.IDNAError:
+        # Labels such as "my_site" are not valid IDNA but still usable as keys
+        return domain
+
+
+def find_lookup_index(collection) -> Optional[str]:
+    """
+    Return the name of an existing index with the lookup keys, whatever it is called.
+    
+    Args:
+        collection: MongoDB collection used for domain lookups
+    
+    Returns:
+        The index name, or None if the collection has no such index
+    """
+    for name, info in collection.index_information().items():
+        if list(info.get("key", [])) == URHEBER_INDEX_KEYS:
+            return name
+    return None
+
+
+def warmup_connection(collection, index_name: Optional[str] = None) -> None:
+    """
+    Prime the connection pool, the plan cache and the lookup index pages.
+    
+    Runs a count and an explained dummy lookup so the first real query of the
+    process does not pay the cold-start cost.
+    
+    Args:
+        collection: MongoDB collection used for domain lookups
+        index_name: Lookup index to hint, or None to let the planner choose
+    """
+    try:
+        collection.estimated_document_count()
+        cursor = collection.find(
+            {"domain_key": "__warmup__", "has_urheber": True},
+            {"urheber": 1, "_id": 0}
+        )
+        if index_name:
+            cursor = cursor.hint(index_name)
+        cursor.limit(1).explain()
+    except Exception as e:
+        logger.warning("Error warming up MongoDB connection: %s", e)
+
+
+def ensure_lookup_index(collection) -> str:
+    """
+    Setup step: create the covering index used by the domain lookup and warm it up.
+    
+    Run once per deployment (with a user allowed to create indexes) before the
+    analyzers start; the lookup itself never creates indexes.
+    
+    Args:
+        collection: MongoDB collection used for domain lookups
+    
+    Returns:
+        Name of the lookup index
+    """
+    # Contains every field of the lookup query and projection, so it can be answered from the index alone
+    index_name = collection.create_index(URHEBER_INDEX_KEYS, name=URHEBER_INDEX_NAME)
+    warmup_connection(collection, index_name)
+    return index_name
+
+
+def migrate_lookup_fields(collection, batch_size: int = MIGRATION_BATCH_SIZE) -> int:
+    """
+    One-time migration writing the precomputed ``domain_key`` and ``has_urheber`` fields.
+    
+    Older documents only carry ``domain_info`` ({"domain": ..., "tld": ...}) or a
+    plain ``domain`` field, and no ``has_urheber`` flag, so the indexed lookup in
+    ``UrhebertAnalyzer`` cannot find them until this has run. Updates are sent
+    as unordered bulk writes of ``batch_size`` documents.
+    
+    Args:
+        collection: MongoDB collection to migrate
+        batch_size: Number of updates per bulk write
+    
+    Returns:
+        Number of updated documents
+    """
+    updated = 0
+    operations = []
+    cursor = collection.find(
+        {"$or": [{"domain_key": {"$exists": False}}, {"has_urheber": {"$exists": False}}]},
+        {"domain_info": 1, "domain": 1, "domain_key": 1, "urheber": 1}
+    )
+    for doc in cursor:
+        fields = {"has_urheber": bool(doc.get("urheber"))}
+        if "domain_key" not in doc:
+            domain_info = doc.get("domain_info") or {}
+            domain = domain_info.get("domain", "")
+            tld = domain_info.get("tld", "")
+            if domain and tld:
+                fields["domain_key"] = make_domain_key(f"{domain}.{tld}")
+            elif isinstance(doc.get("domain"), str) and doc["domain"]:
+                fields["domain_key"] = make_domain_key(doc["domain"])
+        operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": fields}))
+        if len(operations) >= batch_size:
+            updated += collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        updated += collection.bulk_write(operations, ordered=False).modified_count
+    return updated
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Create the lookup index and migrate existing documents"""
+    parser = argparse.ArgumentParser(description="Set up the urheber domain lookup on a MongoDB collection")
+    parser.add_argument("--uri", default=os.getenv("MONGO_URI", "mongodb://localhost:27017"),
+                        help="MongoDB connection string (default: $MONGO_URI)")
+    parser.add_argument("--db", default=os.getenv("MONGO_DB"), required=os.getenv("MONGO_DB") is None,
+                        help="Database name (default: $MONGO_DB)")
+    parser.add_argument("--collection", default=os.getenv("MONGO_COLLECTION"),
+                        required=os.getenv("MONGO_COLLECTION") is None,
+                        help="Collection name (default: $MONGO_COLLECTION)")
+    parser.add_argument("--skip-migration", action="store_true",
+                        help="Only create the index, do not backfill existing documents")
+    args = parser.parse_args(argv)
+    
+    setup_logging()
+    client = MongoClient(args.uri)
+    try:
+        collection = client[args.db][args.collection]
+        index_name = ensure_lookup_index(collection)
+        logger.info("Lookup index %s ready on %s", index_name, collection.full_name)
+        if not args.skip_migration:
+            updated = migrate_lookup_fields(collection)
+            logger.info("Migrated %d documents in %s", updated, collection.full_name)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,55 @@
 """
 Analyzer for determining the organization type of a domain
 """
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from analyzers.base_analyzer import BaseAnalyzer
-import json
+from domain_cache import get_domain_cache
+from domain_patterns import build_suffix_table, load_known_orgs, match_domain_pattern
+from lookup_index import find_lookup_index, make_domain_key
+from openai import AsyncOpenAI
+from openai_clients import create_async_openai_client, get_openai_client
+from prompts import (
+    CLASSIFICATION_RESPONSE_FORMAT,
+    CLASSIFICATION_SYSTEM_MESSAGE,
+    create_domain_message,
+    parse_classification,
+)
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Upper bound for concurrent OpenAI requests in analyze_many
+MAX_CONCURRENT_REQUESTS = 16
+
+# Server-side time limit for the domain lookup; slower queries fall through to research
+DB_QUERY_TIMEOUT_MS = 200
+
+# Lookup index name to hint per collection (None if no usable index exists), resolved
+# once per process. Keyed by the collection's full name, not the Collection object: a
+# fresh db[name] object must map to the same entry, and hashing a Collection hashes the
+# MongoClient, which on pymongo 3.x can block on server selection or raise.
+_lookup_index_names = {}
+
 
 class UrhebertAnalyzer(BaseAnalyzer):
     """Analyzer for determining the organization type of a domain"""
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache = get_domain_cache()
+        self.suffix_table = build_suffix_table(load_known_orgs())
+        # Share one client and connection pool across all analyzer instances
+        self.client = get_openai_client()
+    
     def analyze(self, document: Dict, **kwargs) -> Dict:
         """
         Determine the organization type (urheber) for a domain.
         
-        First checks the database for existing entries with the same domain.
-        If none found, uses web search to research the domain.
+        First checks the in-memory domain cache, then the database for existing
+        entries with the same domain, then state TLDs and known organizations. If
+        none match, uses web search to research the domain and writes the result
+        through to the cache and the database.
         
         Args:
             document: Document dictionary
@@ -25,20 +61,128 @@ class UrhebertAnalyzer(BaseAnalyzer):
         url = document.get('url', '')
         collection = kwargs.get("collection", None)
         
-        # Extract the domain from the URL (use domain_info if present in the document)
+        full_domain = self._get_full_domain(document)
+        if not full_domain:
+            return {"urheber": "unbekannt", "confidence": 0, "method": "failure"}
+        
+        # 1. + 2. Check the cache and MongoDB for existing classifications
+        known = self._lookup_known_domain(collection, full_domain)
+        if known:
+            return known
+        
+        # 3. Classify obvious domains (state TLDs, known organizations) without the LLM
+        pattern_result = self._match_pattern(full_domain)
+        if pattern_result:
+            return pattern_result
+        
+        # 4. Use web search to determine the organization type
+        result = self._research_domain_with_web_search(full_domain, url)
+        self._store_result(document, collection, full_domain, result)
+        return result
+    
+    async def analyze_many(self, documents: List[Dict], **kwargs) -> List[Dict]:
+        """
+        Determine the organization type for many documents concurrently.
+        
+        Uses the async OpenAI client with at most MAX_CONCURRENT_REQUESTS requests
+        in flight. Each distinct domain is classified once per batch and the result
+        is shared by all documents of that domain. Results are returned in the
+        order of the input documents.
+        
+        Args:
+            documents: List of document dictionaries
+            **kwargs: Additional arguments including MongoDB collection
+        
+        Returns:
+            List of organization type analysis results
+        """
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        domain_tasks: Dict[str, asyncio.Task] = {}
+        # One client per batch, closed before the event loop ends
+        async with create_async_openai_client() as client:
+            return await asyncio.gather(
+                *(self._analyze_one(document, client, semaphore, domain_tasks, **kwargs) for document in documents)
+            )
+    
+    async def _analyze_one(self, document: Dict, client: AsyncOpenAI, semaphore: asyncio.Semaphore,
+                           domain_tasks: Dict[str, asyncio.Task], **kwargs) -> Dict:
+        """Async counterpart of analyze used by analyze_many"""
+        collection = kwargs.get("collection", None)
+        
+        full_domain = self._get_full_domain(document)
+        if not full_domain:
+            return {"urheber": "unbekannt", "confidence": 0, "method": "failure"}
+        
+        # Documents sharing a domain wait on the same classification instead of each
+        # missing the cache and starting their own web search
+        task = domain_tasks.get(full_domain)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._classify_domain(full_domain, document.get('url', ''), collection, client, semaphore)
+            )
+            domain_tasks[full_domain] = task
+        shared_result, researched = await task
+        
+        result = dict(shared_result)
+        if researched:
+            await asyncio.to_thread(self._store_result, document, collection, full_domain, result)
+        return result
+    
+    async def _classify_domain(self, full_domain: str, url: str, collection, client: AsyncOpenAI,
+                               semaphore: asyncio.Semaphore) -> Tuple[Dict, bool]:
+        """Classify a domain once per batch; the flag tells whether web search was used"""
+        async with semaphore:
+            # The pymongo lookup blocks, so keep it off the event loop
+            known = await asyncio.to_thread(self._lookup_known_domain, collection, full_domain)
+            if known:
+                return known, False
+            
+            pattern_result = self._match_pattern(full_domain)
+            if pattern_result:
+                return pattern_result, False
+            
+            result = await self._research_domain_with_web_search_async(client, full_domain, url)
+            return result, True
+    
+    def _get_full_domain(self, document: Dict) -> Optional[str]:
+        """Build the normalized domain from the document's domain_info"""
         domain_info = document.get("domain_info", {})
         domain = domain_info.get("domain", "")
         tld = domain_info.get("tld", "")
         
         if not domain or not tld:
-            return {"urheber": "unbekannt", "confidence": 0, "method": "failure"}
+            return None
         
-        full_domain = f"{domain}.{tld}"
+        return f"{domain}.{tld}".lower()
+    
+    def _match_pattern(self, full_domain: str) -> Optional[Dict]:
+        """Return a pattern-based classification if the domain is trivially classifiable"""
+        urheber = match_domain_pattern(full_domain, self.suffix_table)
+        if not urheber:
+            return None
+        
+        return {
+            "urheber": urheber,
+            "confidence": 0.95,
+            "method": "pattern",
+            "domain": full_domain
+        }
+    
+    def _lookup_known_domain(self, collection, full_domain: str) -> Optional[Dict]:
+        """Return an existing classification from the cache or MongoDB, if any"""
+        cached_urheber = self.cache.get(full_domain)
+        if cached_urheber:
+            return {
+                "urheber": cached_urheber,
+                "confidence": 1.0,
+                "method": "cache",
+                "domain": full_domain
+            }
         
-        # 1. Check MongoDB for existing entries with the same domain
         if collection is not None:
             existing_urheber = self._check_database_for_domain(collection, full_domain)
             if existing_urheber:
+                self.cache.set(full_domain, existing_urheber)
                 return {
                     "urheber": existing_urheber,
                     "confidence": 1.0,
@@ -46,30 +190,70 @@ class UrhebertAnalyzer(BaseAnalyzer):
                     "domain": full_domain
                 }
         
-        # 2. Use web search to determine the organization type
-        return self._research_domain_with_web_search(full_domain, url)
+        return None
+    
+    def _store_result(self, document: Dict, collection, domain: str, result: Dict) -> None:
+        """Write a successful classification through to the cache and MongoDB"""
+        urheber = result.get("urheber")
+        if result.get("method") == "error" or not urheber or urheber == "unbekannt":
+            return
+        
+        self.cache.set(domain, urheber)
+        
+        if collection is None or "_id" not in document:
+            return
+        try:
+            collection.update_one(
+                {"_id": document["_id"]},
+                {"$set": {"domain_key": make_domain_key(domain), "has_urheber": True, "urheber": urheber}}
+            )
+        except Exception as e:
+            logger.warning("Error writing urheber classification for domain %s to MongoDB: %s", domain, e)
+    
+    def _get_lookup_index(self, collection) -> Optional[str]:
+        """
+        Resolve the index to hint for the domain lookup (once per collection).
+        
+        Read-only: the index is created by ``python lookup_index.py``. Returns None if the
+        collection has no usable index, and remembers that too, so the lookup does
+        not list indexes on every call.
+        """
+        if collection.full_name in _lookup_index_names:
+            return _lookup_index_names[collection.full_name]
+        try:
+            index_name = find_lookup_index(collection)
+        except Exception as e:
+            logger.warning("Error listing MongoDB indexes for domain lookup: %s", e)
+            index_name = None
+        if index_name is None:
+            logger.warning("No lookup index on %s (run lookup_index.py); querying without a hint",
+                           collection.full_name)
+        _lookup_index_names[collection.full_name] = index_name
+        return index_name
     
     def _check_database_for_domain(self, collection, domain: str) -> str:
         """Check if there are any documents with the same domain that have an urheber field"""
         try:
-            # Query for documents containing the domain in their URL
-            domain_query = {"domain": {"$regex": domain, "$options": "i"}}
-            # Look for documents with an urheber field
-            urheber_query = {"urheber": {"$exists": True, "$ne": ""}}
+            index_name = self._get_lookup_index(collection)
+            
+            # Equality probes on precomputed fields only, so the query is a pure index scan
+            query = {"domain_key": make_domain_key(domain), "has_urheber": True}
             
-            # Combine queries
-            query = {"$and": [domain_query, urheber_query]}
+            # Only hint an index that exists; MongoDB rejects hints naming a missing index
+            options = {"max_time_ms": DB_QUERY_TIMEOUT_MS}
+            if index_name:
+                options["hint"] = index_name
             
             # Find one matching document
-            result = collection.find_one(query, {"urheber": 1, "_id": 0})
+            result = collection.find_one(query, {"urheber": 1, "_id": 0}, **options)
             
             if result and "urheber" in result:
-                print(f"Found existing urheber classification for domain {domain}: {result['urheber']}")
+                logger.debug("Found existing urheber classification for domain %s: %s", domain, result["urheber"])
                 return result["urheber"]
             else:
-                print(f"No existing urheber classification found for domain {domain}")
+                logger.debug("No existing urheber classification found for domain %s", domain)
         except Exception as e:
-            print(f"Error querying MongoDB for domain {domain}: {e}")
+            logger.warning("Error querying MongoDB for domain %s: %s", domain, e)
         
         return None
     
@@ -77,6 +261,9 @@ class UrhebertAnalyzer(BaseAnalyzer):
         """
         Use OpenAI with web search to research the domain and determine organization type.
         
+        Search and classification happen in a single Responses API call with the
+        built-in web_search tool.
+        
         Args:
             domain: The domain to research (e.g., example.com)
             url: The full URL for additional context
@@ -84,136 +271,69 @@ class UrhebertAnalyzer(BaseAnalyzer):
         Returns:
             Organization type analysis results
         """
-        print(f"Researching domain {domain} using web search...")
-        
-        # First, define the web search function
-        web_search_function = {
-            "name": "web_search",
-            "description": "Search the web for information about a domain or website",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "query": {
-                        "type": "string", 
-                        "description": "The search query to use"
-                    }
-                },
-                "required": ["query"]
-            }
-        }
-        
-        # Create a search query prompt
-        search_query = f"Wer betreibt die Website {domain} oder {url}? Ist es eine staatliche Einrichtung, Organisation, Unternehmen oder Privatperson?"
+        logger.debug("Researching domain %s using web search...", domain)
         
         try:
-            # First, execute a search using the web_search function
-            search_response = self.client.chat.completions.create(
+            response = self.client.responses.create(
                 model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You search the web for information and provide factual information only."},
-                    {"role": "user", "content": search_query}
-                ],
-                tools=[{"type": "function", "function": web_search_function}],
-                tool_choice={"type": "function", "function": {"name": "web_search"}}
+                input=self._create_urheber_prompt(domain, url),
+                tools=[{"type": "web_search"}],
+                temperature=0,
+                text={"format": CLASSIFICATION_RESPONSE_FORMAT}
             )
             
-            # Check if there's a tool call in the response
-            search_message = search_response.choices[0].message
-            
-            # Extract the search results
-            if hasattr(search_message, 'tool_calls') and search_message.tool_calls:
-                tool_call = search_message.tool_calls[0]
-                search_args = json.loads(tool_call.function.arguments)
-                search_results = f"Search query: {search_args.get('query', search_query)}"
-                
-                # Now get the search results by submitting the tool call
-                results_response = self.client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=[
-                        {"role": "system", "content": "You search the web for information and provide factual information only."},
-                        {"role": "user", "content": search_query},
-                        search_message,
-                        {"role": "tool", "tool_call_id": tool_call.id, "name": "web_search", "content": "Search results for the domain..."}
-                    ]
-                )
-                
-                search_results = results_response.choices[0].message.content
-            else:
-                search_results = "No search results available."
-            
-            # Now classify based on search results
-            classification_prompt = f"""Basierend auf den folgenden Suchergebnissen, klassifiziere den Betreiber der Domain {domain} in GENAU EINE dieser Kategorien:
-            
-- "staatlich" (Behörde, Ministerium, staatliche Einrichtung)
-- "nicht staatliche Hilfsorganisation" (NGO, Hilfswerk, gemeinnützige Organisation)
-- "sonstige Vereine" (Vereine, die keine Hilfsorganisationen sind)
-- "Organisationen" (internationale Organisationen, Verbände)
-- "Gemeinschaften" (informelle Gruppen, Communities, Netzwerke)
-- "Unternehmen" (kommerzielle Unternehmen, GmbH, AG, etc.)
-- "Privatperson" (von Einzelpersonen betriebene Webseiten)
-
-Suchergebnisse:
-{search_results}
-
-URL: {url}
-
-Antworte im JSON-Format:
-{{
-  "urheber": "KATEGORIE",
-  "begründung": "Kurze Begründung für die Einordnung",
-  "quellen": ["Quelle 1", "Quelle 2"]
-}}"""
+            return self._create_web_search_result(domain, response.output_text)
             
-            classification_response = self.client.chat.completions.create(
+        except Exception as e:
+            return self._create_web_search_error(domain, e)
+    
+    async def _research_domain_with_web_search_async(self, client: AsyncOpenAI, domain: str, url: str) -> Dict:
+        """Async counterpart of _research_domain_with_web_search using AsyncOpenAI"""
+        logger.debug("Researching domain %s using web search...", domain)
+        
+        try:
+            response = await client.responses.create(
                 model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You analyze website operators and classify them into categories."},
-                    {"role": "user", "content": classification_prompt}
-                ],
-                response_format={"type": "json_object"}
+                input=self._create_urheber_prompt(domain, url),
+                tools=[{"type": "web_search"}],
+                temperature=0,
+                text={"format": CLASSIFICATION_RESPONSE_FORMAT}
             )
             
-            # Process and return results
-            result = self._process_response(classification_response.choices[0].message.content)
-            result["method"] = "web_search"
-            result["confidence"] = 0.8  # Estimated confidence for web search
-            result["domain"] = domain
-            
-            print(f"Web search classification for {domain}: {result.get('urheber', 'unknown')}")
-            return result
+            return self._create_web_search_result(domain, response.output_text)
             
         except Exception as e:
-            print(f"Error using web search for domain {domain}: {e}")
-            return {
-                "urheber": "unbekannt", 
-                "confidence": 0, 
-                "method": "error", 
-                "error": str(e),
-                "domain": domain
-            }
+            return self._create_web_search_error(domain, e)
+    
+    def _create_web_search_result(self, domain: str, content: str) -> Dict:
+        """Process the classification response and add web search metadata"""
+        try:
+            result = parse_classification(content)
+        except ValueError as e:
+            # Unusable answer: report it as unknown rather than spending a retry call
+            return self._create_web_search_error(domain, e)
+        result["method"] = "web_search"
+        result["confidence"] = 0.8  # Estimated confidence for web search
+        result["domain"] = domain
+        
+        logger.info("Web search classification for %s: %s", domain, result.get("urheber", "unknown"))
+        return result
+    
+    def _create_web_search_error(self, domain: str, error: Exception) -> Dict:
+        """Create the result returned when the web search fails"""
+        logger.error("Error using web search for domain %s: %s", domain, error)
+        return {
+            "urheber": "unbekannt", 
+            "confidence": 0, 
+            "method": "error", 
+            "error": str(error),
+            "domain": domain
+        }
             
-    def _create_urheber_prompt(self, domain: str, url: str) -> str:
-        """Create prompt for organization type analysis"""
-        return f"""Recherchiere den Betreiber der Website/Domain: {domain} ({url}).
-
-Aufgabe: Bestimme, welcher Kategorie der Betreiber der Website angehört. 
-
-Suche nach:
-1. Informationen über den Webseitenbetreiber (Impressum, About, Legal, Contact pages)
-2. Organisationsform (GmbH, AG, e.V., Behörde, etc.)
-3. Staatliche Verbindungen oder Funktion
-4. Nonprofit-Status oder gemeinnütziger Zweck
-5. Ob es sich um eine Privatperson handelt
-
-Klassifiziere den Betreiber in GENAU EINE dieser Kategorien:
-- "staatlich" (Behörde, Ministerium, staatliche Einrichtung)
-- "nicht staatliche Hilfsorganisation" (NGO, Hilfswerk, gemeinnützige Organisation)
-- "sonstige Vereine" (Vereine, die keine Hilfsorganisationen sind)
-- "Organisationen" (internationale Organisationen, Verbände)
-- "Gemeinschaften" (informelle Gruppen, Communities, Netzwerke)
-- "Unternehmen" (kommerzielle Unternehmen, GmbH, AG, etc.)
-- "Privatperson" (von Einzelpersonen betriebene Webseiten)
-
-Begründe deine Einordnung und gib deine Quellen an.
-Antworte im JSON-Format.
-"""
+    def _create_urheber_prompt(self, domain: str, url: str) -> List[Dict]:
+        """Create prompt for organization type analysis (static rubric first, domain last)"""
+        # The rubric message is shared, so only the short domain message is built per call
+        return [
+            CLASSIFICATION_SYSTEM_MESSAGE,
+            {"role": "user", "content": create_domain_message(domain, url)}
+        ]
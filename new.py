@@ -1,7 +1,18 @@
-import os
-import json
-from typing import Dict, Any
-from openai import OpenAI
+import asyncio
+from typing import Dict, Any, List, Optional, Tuple
+from openai import AsyncOpenAI
+from openai_clients import create_async_openai_client, get_openai_client
+from domain_cache import get_domain_cache
+from domain_patterns import build_suffix_table, load_known_orgs, match_domain_pattern
+from prompts import (
+    CLASSIFICATION_RESPONSE_FORMAT,
+    CLASSIFICATION_SYSTEM_MESSAGE,
+    create_domain_message,
+    parse_classification,
+)
+
+# Upper bound for concurrent OpenAI requests in analyze_many
+MAX_CONCURRENT_REQUESTS = 16
 
 class UrhebertAnalyzer:
     """
@@ -9,7 +20,10 @@ class UrhebertAnalyzer:
     """
 
     def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        # Share one client and connection pool across all analyzer instances
+        self.client = get_openai_client()
+        self.cache = get_domain_cache()
+        self.suffix_table = build_suffix_table(load_known_orgs())
 
     def analyze(self, document: Dict[str, Any], **kwargs) -> Dict[str, Any]:
         """
@@ -21,73 +35,164 @@ class UrhebertAnalyzer:
         Returns:
             Dict[str, Any]: Analysis results including the organization type and related metadata.
         """
+        full_domain, known = self._prepare(document)
+        if known is not None:
+            return known
+
+        try:
+            # Use the Responses API with the web_search tool
+            response = self.client.responses.create(
+                model="gpt-4o",
+                input=self._create_prompt(full_domain, document.get("url", "")),
+                tools=[{"type": "web_search"}],
+                temperature=0,
+                text={"format": CLASSIFICATION_RESPONSE_FORMAT}
+            )
+
+            return self._create_result(full_domain, response.output_text)
+
+        except Exception as e:
+            return self._create_error(full_domain, e)
+
+    async def analyze_many(self, documents: List[Dict[str, Any]], **kwargs) -> List[Dict[str, Any]]:
+        """
+        Analyze many documents concurrently using the async OpenAI client.
+
+        Each distinct domain is researched once per batch and the result is shared by all
+        documents of that domain.
+
+        Args:
+            documents (List[Dict[str, Any]]): The documents containing domain information.
+
+        Returns:
+            List[Dict[str, Any]]: Analysis results in the order of the input documents.
+        """
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        domain_tasks: Dict[str, asyncio.Task] = {}
+        # One client per batch, closed before the event loop ends
+        async with create_async_openai_client() as client:
+            return await asyncio.gather(
+                *(self._analyze_one(document, client, semaphore, domain_tasks) for document in documents)
+            )
+
+    async def _analyze_one(self, document: Dict[str, Any], client: AsyncOpenAI, semaphore: asyncio.Semaphore,
+                           domain_tasks: Dict[str, asyncio.Task]) -> Dict[str, Any]:
+        """
+        Async counterpart of analyze used by analyze_many.
+        """
+        full_domain, known = self._prepare(document)
+        if known is not None:
+            return known
+
+        # Documents sharing a domain wait on the same research call instead of each
+        # missing the cache and starting their own
+        task = domain_tasks.get(full_domain)
+        if task is None:
+            task = asyncio.ensure_future(self._research(client, full_domain, document.get("url", ""), semaphore))
+            domain_tasks[full_domain] = task
+        return dict(await task)
+
+    async def _research(self, client: AsyncOpenAI, full_domain: str, url: str,
+                        semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+        """
+        Research a domain with the async Responses API.
+        """
+        async with semaphore:
+            try:
+                response = await client.responses.create(
+                    model="gpt-4o",
+                    input=self._create_prompt(full_domain, url),
+                    tools=[{"type": "web_search"}],
+                    temperature=0,
+                    text={"format": CLASSIFICATION_RESPONSE_FORMAT}
+                )
+
+                return self._create_result(full_domain, response.output_text)
+
+            except Exception as e:
+                return self._create_error(full_domain, e)
+
+    def _prepare(self, document: Dict[str, Any]) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Extract the full domain and return an early result for invalid, cached or pattern-matched domains.
+        """
         domain_info = document.get("domain_info", {})
         domain = domain_info.get("domain", "")
         tld = domain_info.get("tld", "")
-        url = document.get("url", "")
 
         if not domain or not tld:
-            return {
+            return "", {
                 "urheber": "unbekannt",
                 "confidence": 0,
                 "method": "failure",
                 "reason": "Missing domain or TLD information."
             }
 
-        full_domain = f"{domain}.{tld}"
+        full_domain = f"{domain}.{tld}".lower()
 
-        # Construct the prompt for classification
-        prompt = f"""
-Recherchiere den Betreiber der Website/Domain: {full_domain} ({url}).
+        # Return a cached classification without calling the API
+        cached_urheber = self.cache.get(full_domain)
+        if cached_urheber:
+            return full_domain, {
+                "urheber": cached_urheber,
+                "confidence": 1.0,
+                "method": "cache",
+                "domain": full_domain
+            }
 
-Aufgabe: Bestimme, welcher Kategorie der Betreiber der Website angehört.
+        # Classify obvious domains (state TLDs, known organizations) without calling the API
+        pattern_urheber = match_domain_pattern(full_domain, self.suffix_table)
+        if pattern_urheber:
+            return full_domain, {
+                "urheber": pattern_urheber,
+                "confidence": 0.95,
+                "method": "pattern",
+                "domain": full_domain
+            }
 
-Kategorien:
-- "staatlich" (Behörde, Ministerium, staatliche Einrichtung)
-- "nicht staatliche Hilfsorganisation" (NGO, Hilfswerk, gemeinnützige Organisation)
-- "sonstige Vereine" (Vereine, die keine Hilfsorganisationen sind)
-- "Organisationen" (internationale Organisationen, Verbände)
-- "Gemeinschaften" (informelle Gruppen, Communities, Netzwerke)
-- "Unternehmen" (kommerzielle Unternehmen, GmbH, AG, etc.)
-- "Privatperson" (von Einzelpersonen betriebene Webseiten)
+        return full_domain, None
 
-Bitte gib die Kategorie des Betreibers an, eine kurze Begründung und nenne die verwendeten Quellen.
-Antworte im folgenden JSON-Format:
-{{
-  "urheber": "KATEGORIE",
-  "begründung": "Kurze Begründung für die Einordnung",
-  "quellen": ["Quelle 1", "Quelle 2"]
-}}
-"""
+    def _create_prompt(self, full_domain: str, url: str) -> List[Dict[str, str]]:
+        """
+        Construct the prompt for classification.
 
-        try:
-            # Use the Responses API with the web_search tool
-            response = self.client.responses.create(
-                model="gpt-4o",
-                input=prompt,
-                tools=[{"type": "web_search"}]
-            )
+        The shared static rubric message comes first so that consecutive requests share a
+        cacheable prefix; only the short domain message is built per call.
+        """
+        return [
+            CLASSIFICATION_SYSTEM_MESSAGE,
+            {"role": "user", "content": create_domain_message(full_domain, url)}
+        ]
 
-            # Extract the output text
-            output_text = response.output_text
+    def _create_result(self, full_domain: str, output_text: str) -> Dict[str, Any]:
+        """
+        Parse the structured output, add metadata and write the classification to the cache.
+        """
+        try:
+            result = parse_classification(output_text)
+        except ValueError as e:
+            return self._create_error(full_domain, e)
 
-            # Parse the JSON response
-            result = json.loads(output_text)
+        # Add additional metadata
+        result.update({
+            "method": "responses_api_web_search",
+            "confidence": 0.9,
+            "domain": full_domain
+        })
 
-            # Add additional metadata
-            result.update({
-                "method": "responses_api_web_search",
-                "confidence": 0.9,
-                "domain": full_domain
-            })
+        if result.get("urheber") and result["urheber"] != "unbekannt":
+            self.cache.set(full_domain, result["urheber"])
 
-            return result
+        return result
 
-        except Exception as e:
-            return {
-                "urheber": "unbekannt",
-                "confidence": 0,
-                "method": "error",
-                "error": str(e),
-                "domain": full_domain
-            }
+    def _create_error(self, full_domain: str, error: Exception) -> Dict[str, Any]:
+        """
+        Create the result returned when the API call or parsing fails.
+        """
+        return {
+            "urheber": "unbekannt",
+            "confidence": 0,
+            "method": "error",
+            "error": str(error),
+            "domain": full_domain
+        }
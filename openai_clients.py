@@ -0,0 +1,44 @@
+"""
+OpenAI clients sharing one set of HTTP connection settings
+
+The sync client and its keep-alive connection pool are created once per process and
+reused by every analyzer instance. Pool size and timeout are set explicitly so up to
+MAX_CONCURRENT_REQUESTS requests can run without waiting for a connection.
+"""
+import os
+import threading
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+HTTP_TIMEOUT = 30.0
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=64, max_connections=128)
+
+_client = None
+_lock = threading.Lock()
+
+
+def get_openai_client() -> OpenAI:
+    """Return the shared sync OpenAI client, creating it on first use"""
+    global _client
+    with _lock:
+        if _client is None:
+            _client = OpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                http_client=DefaultHttpxClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT),
+            )
+        return _client
+
+
+def create_async_openai_client() -> AsyncOpenAI:
+    """
+    Create an AsyncOpenAI client with the shared connection settings.
+
+    Async connections are bound to the event loop that opened them, so async clients
+    are not shared process-wide. Use one per batch as an async context manager so
+    its connections are closed before the loop ends.
+    """
+    return AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        http_client=DefaultAsyncHttpxClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT),
+    )
@@ -0,0 +1,124 @@
+"""
+Prompts for determining the organization type (urheber) of a domain
+
+The classification rubric is a fixed prefix that never contains per-request data,
+so OpenAI's prompt caching can reuse it across domains. Only the short domain
+message that follows it changes between requests.
+"""
+import json
+from typing import Any, Dict
+
+URHEBER_CATEGORIES = [
+    "staatlich",
+    "nicht staatliche Hilfsorganisation",
+    "sonstige Vereine",
+    "Organisationen",
+    "Gemeinschaften",
+    "Unternehmen",
+    "Privatperson",
+]
+
+# Structured output format for the Responses API (text={"format": ...})
+CLASSIFICATION_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "name": "urheber_classification",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "urheber": {"type": "string", "enum": URHEBER_CATEGORIES},
+            "begründung": {"type": "string"},
+            "quellen": {"type": "array", "items": {"type": "string"}},
+        },
+        "required": ["urheber", "begründung", "quellen"],
+        "additionalProperties": False,
+    },
+}
+
+CLASSIFICATION_SYSTEM_PROMPT = """Recherchiere den Betreiber der Website/Domain, die in der nächsten Nachricht zusammen mit der URL genannt wird.
+
+Aufgabe: Bestimme, welcher Kategorie der Betreiber der Website angehört.
+
+Suche nach:
+1. Informationen über den Webseitenbetreiber (Impressum, About, Legal, Contact pages)
+2. Organisationsform (GmbH, AG, e.V., Behörde, etc.)
+3. Staatliche Verbindungen oder Funktion
+4. Nonprofit-Status oder gemeinnütziger Zweck
+5. Ob es sich um eine Privatperson handelt
+
+Klassifiziere den Betreiber in GENAU EINE dieser Kategorien:
+- "staatlich" (Behörde, Ministerium, staatliche Einrichtung)
+- "nicht staatliche Hilfsorganisation" (NGO, Hilfswerk, gemeinnützige Organisation)
+- "sonstige Vereine" (Vereine, die keine Hilfsorganisationen sind)
+- "Organisationen" (internationale Organisationen, Verbände)
+- "Gemeinschaften" (informelle Gruppen, Communities, Netzwerke)
+- "Unternehmen" (kommerzielle Unternehmen, GmbH, AG, etc.)
+- "Privatperson" (von Einzelpersonen betriebene Webseiten)
+
+Begründe deine Einordnung und gib deine Quellen an.
+
+Antwortformat:
+- Antworte ausschließlich mit einem einzelnen JSON-Objekt.
+- Verwende keinen Markdown-Codeblock und schreibe keinen Text vor oder nach dem JSON-Objekt.
+- Das Objekt enthält genau die drei Felder "urheber", "begründung" und "quellen" und keine weiteren Felder.
+- Verwende für Feldnamen und Zeichenketten doppelte Anführungszeichen. Anführungszeichen innerhalb einer Zeichenkette werden mit einem Backslash maskiert.
+
+Feld "urheber":
+- Typ: Zeichenkette.
+- Erlaubt ist genau einer der folgenden Werte, in exakt dieser Schreibweise:
+  "staatlich"
+  "nicht staatliche Hilfsorganisation"
+  "sonstige Vereine"
+  "Organisationen"
+  "Gemeinschaften"
+  "Unternehmen"
+  "Privatperson"
+- Groß- und Kleinschreibung, Leerzeichen und Umlaute müssen exakt übereinstimmen.
+- Keine Abkürzungen, keine Übersetzungen, keine Anführungszeichen innerhalb des Wertes und keine zusätzlichen Erläuterungen in diesem Feld.
+- Gib immer genau eine Kategorie an, niemals eine Liste von Kategorien und niemals einen leeren Wert.
+
+Feld "begründung":
+- Typ: Zeichenkette.
+- Kurze Begründung für die Einordnung auf Deutsch, in ganzen Sätzen.
+- Die Begründung steht nur in diesem Feld, nicht in den anderen Feldern.
+
+Feld "quellen":
+- Typ: Liste von Zeichenketten.
+- Jeder Eintrag ist eine verwendete Quelle, möglichst als vollständige URL (z.B. die Impressumsseite).
+- Jede Quelle wird nur einmal aufgeführt.
+- Wurden keine Quellen verwendet, ist der Wert eine leere Liste [].
+
+Antworte im folgenden JSON-Format:
+{
+  "urheber": "KATEGORIE",
+  "begründung": "Kurze Begründung für die Einordnung",
+  "quellen": ["Quelle 1", "Quelle 2"]
+}
+"""
+
+# Built once and shared by every request; never mutate it
+CLASSIFICATION_SYSTEM_MESSAGE = {"role": "system", "content": CLASSIFICATION_SYSTEM_PROMPT}
+
+
+def create_domain_message(domain: str, url: str) -> str:
+    """Create the short per-request message that follows the static rubric"""
+    return f"Domain: {domain}\nURL: {url}"
+
+
+def parse_classification(output_text: str) -> Dict[str, Any]:
+    """
+    Parse a structured classification answer.
+    
+    Args:
+        output_text: Output text of a response created with CLASSIFICATION_RESPONSE_FORMAT
+    
+    Returns:
+        The parsed classification
+    
+    Raises:
+        ValueError: If the answer is not valid JSON or has an unknown category
+    """
+    result = json.loads(output_text)
+    if not isinstance(result, dict) or result.get("urheber") not in URHEBER_CATEGORIES:
+        raise ValueError(f"Invalid urheber classification: {output_text!r}")
+    return result